@@ -0,0 +1,8 @@
+# fastest installed json parser, all accept bytes and fall back to the standard library
+try:
+    from orjson import loads
+except ImportError:
+    try:
+        from ujson import loads
+    except ImportError:
+        from json import loads
@@ -1,19 +1,21 @@
 # packages
 import os
 import time
-import json
+import queue
 import argparse
+import threading
 import datetime
+import urllib.parse
 import requests
-import sseclient
+from concurrent.futures import ThreadPoolExecutor
 import numpy             as np
-import matplotlib.pyplot as plt
 
 # project
 import config.styling       as stl
 import config.parameters    as params
 import cold_storage.helpers as hlp
-from cold_storage.sensor    import Sensor
+from cold_storage.sensor    import Sensor, replay
+from cold_storage._json     import loads
 
 
 class Director():
@@ -30,6 +32,14 @@ class Director():
         self.project_id   = project_id
         self.api_url_base = api_url_base
 
+        # one authenticated session, keeping connections alive between requests
+        # pool holds a connection for every history thread, the stream gets its own adapter
+        self.session = requests.Session()
+        self.session.auth = (self.username, self.password)
+        adapter = requests.adapters.HTTPAdapter(pool_connections=params.N_HISTORY_THREADS, pool_maxsize=params.N_HISTORY_THREADS, max_retries=3)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
         # parse system arguments
         self.__parse_sysargs()
 
@@ -38,16 +48,26 @@ class Director():
             # perform some initial setups
             self.__local_setup()
 
-            # import file as event history format
-            self.event_history = hlp.import_as_event_history(self.args['path'])
+            # import file as event history format, compacted to records
+            self.event_history = hlp.merge_records([hlp.flatten_history(hlp.import_as_event_history(self.args['path']), self.sensors)])
         
         # use API
         else:
             # set filters for fetching data
             self.__set_filters()
 
-            # set stream endpoint
-            self.stream_endpoint = "{}/projects/{}/devices:stream".format(self.api_url_base, self.project_id)
+            # set devices and stream endpoints
+            self.devices_endpoint = "{}/projects/{}/devices".format(self.api_url_base, self.project_id)
+            self.stream_endpoint  = self.devices_endpoint + ':stream'
+
+            # full stream url and headers, built once instead of on every reconnect
+            # compressed events are decoded by iter_content, uncompressed responses pass through unchanged
+            self.stream_url     = self.stream_endpoint + '?' + urllib.parse.urlencode(self.stream_params, doseq=True)
+            self.stream_headers = {'accept': 'text/event-stream', 'accept-encoding': 'gzip'}
+
+            # stream reconnects are counted and backed off by the receiver, so the adapter must not retry on its own
+            # the longest mounted prefix wins, which leaves other requests on the retrying adapter
+            self.session.mount(self.stream_endpoint, requests.adapters.HTTPAdapter(max_retries=0))
 
             # fetch list of devices in project
             self.__fetch_project_devices()
@@ -55,9 +75,15 @@ class Director():
             # spawn devices instances
             self.__spawn_devices()
 
-            # fetch event history
-            if self.fetch_history:
-                self.__fetch_event_history()
+        # stream is not opened until asked for
+        # events queue up unbounded until served, so none are lost while history runs
+        self.stream_events   = queue.Queue()
+        self.stream_serving  = threading.Event()
+        self.stream_receiver = None
+        self.stream_error    = None
+
+        # unixtime of newest historic sample per sensor, stream events up to it are already served
+        self.history_ux = {}
 
 
     def __parse_sysargs(self):
@@ -136,27 +162,66 @@ class Director():
         """
 
         # request list
-        devices_list_url = "{}/projects/{}/devices".format(self.api_url_base,  self.project_id)
-        device_listing = requests.get(devices_list_url, auth=(self.username, self.password))
+        device_listing = self.session.get(self.devices_endpoint)
         
         # remove fluff
+        devices_json = loads(device_listing.content)
         if device_listing.status_code < 300:
-            self.devices = device_listing.json()['devices']
+            self.devices = devices_json['devices']
         else:
-            print(device_listing.json())
+            print(devices_json)
             hlp.print_error('Status Code: {}'.format(device_listing.status_code), terminate=True)
 
 
     def initialise_plot(self):
         """
-        Create figure and axis instances for progress plot.
+        Create figure, axis and artist instances for progress plot.
+        Artists are kept and updated in place by plot_progress.
 
         """
 
+        # matplotlib is only imported when plotting
+        import matplotlib.pyplot as plt
+        from matplotlib.collections import LineCollection
+
         self.hfig, self.hax = plt.subplots(len(self.sensors), 1, sharex=True)
         if len(self.sensors) < 2:
             self.hax = [self.hax]
 
+        # sensor shown in each axis, iterated by position every frame
+        self.hsensors = list(self.sensors.values())
+        self.hindex   = {sensor_id: i for i, sensor_id in enumerate(self.sensors)}
+
+        # one set of artists per sensor axis
+        self.hartists = []
+        for ax in self.hax:
+            # temperature, level and delay lines as segments of one collection
+            lw = plt.rcParams['lines.linewidth']
+            artists = {
+                'lines': LineCollection([], colors=[stl.wheel[0], 'k', 'k'], linewidths=[lw, 2, lw], label='Temperature'),
+            }
+            ax.add_collection(artists['lines'])
+            ax.xaxis_date()
+            artists['bounds'], artists['alert'] = self.__fill_bounds(ax, [], [], [], [], [])
+            artists['legend'] = ax.legend(loc='upper left')
+            ax.set_ylabel('Temperature [deg]')
+
+            # animated artists are left out of full redraws and blitted on top
+            for artist in artists.values():
+                artist.set_animated(True)
+            self.hartists.append(artists)
+        self.hax[-1].set_xlabel('Time')
+
+        # axis limits and background are set on first frame
+        self.hlimits     = [None for ax in self.hax]
+        self.hbackground = None
+
+        # sample times as matplotlib date numbers, converted as samples arrive
+        self.hdatenum = [np.empty(0) for ax in self.hax]
+
+        # number of samples shown by the artists of each axis
+        self.hplotted = [0 for ax in self.hax]
+
 
     def initialise_debug_plot(self):
         """
@@ -164,7 +229,9 @@ class Director():
 
         """
 
-        self.dfig, self.dax = plt.subplots(3, 1)
+        import matplotlib.pyplot as plt
+
+        self.dfig, self.dax = plt.subplots(3, 1, sharex=True)
 
 
     def __spawn_devices(self):
@@ -176,57 +243,88 @@ class Director():
         # empty lists of devices
         self.sensors = {}
 
+        # sensors keyed by event targetName, both as full resource name and device id
+        self.sensor_targets = {}
+
         # iterate list of devices
         for device in self.devices:
+            # get device id once, reused when fetching history
+            device['device_id'] = device['name'].rpartition('/')[2]
+
             # verify temperature type
             if device['type'] == 'temperature':
-                # get device id
-                device_id = os.path.basename(device['name'])
-
                 # new key in sensor dictionary
-                self.sensors[device_id] = Sensor(device, device_id, self.args)
+                self.sensors[device['device_id']] = Sensor(device, device['device_id'], self.args)
+                self.sensor_targets[device['name']]      = self.sensors[device['device_id']]
+                self.sensor_targets[device['device_id']] = self.sensors[device['device_id']]
 
 
     def __fetch_event_history(self):
         """
         For each sensor in project, request all events since --starttime from API.
+        Devices are fetched concurrently, each in its own thread.
 
         """
 
-        # initialise empty event list
-        self.event_history = []
+        # only temperature sensors are served history, skip other devices
+        device_ids = list(self.sensors)
 
-        # iterate devices
-        for device in self.devices:
-            # isolate device identifier
-            device_id = os.path.basename(device['name'])
-        
-            # some printing
-            print('-- Getting event history for {}'.format(device_id))
-        
-            # initialise next page token
-            self.history_params['page_token'] = None
-        
-            # set endpoints for event history
-            event_list_url = "{}/projects/{}/devices/{}/events".format(self.api_url_base, self.project_id, device_id)
-        
-            # perform paging
-            while self.history_params['page_token'] != '':
-                event_listing = requests.get(event_list_url, auth=(self.username, self.password), params=self.history_params)
-                event_json = event_listing.json()
-        
-                if event_listing.status_code < 300:
-                    self.history_params['page_token'] = event_json['nextPageToken']
-                    self.event_history += event_json['events']
-                else:
-                    print(event_json)
-                    hlp.print_error('Status Code: {}'.format(event_listing.status_code), terminate=True)
-        
-                if self.history_params['page_token'] != '':
-                    print('\t-- paging')
-        
-        # sort event history in time
-        self.event_history.sort(key=hlp.json_sort_key, reverse=False)
+        # target name lookup shared by all pages of all devices
+        index = hlp.sensor_index(self.sensors)
+
+        # network waits release the GIL, so threads fetch in parallel
+        with ThreadPoolExecutor(max_workers=max(1, min(params.N_HISTORY_THREADS, len(device_ids)))) as executor:
+            device_records = list(executor.map(self.__fetch_device_history, device_ids, [index]*len(device_ids)))
+
+        # merge event history of all devices, grouped by sensor for replay
+        self.event_history = hlp.merge_records(device_records)
+
+
+    def __fetch_device_history(self, device_id, index):
+        """
+        Request all events since --starttime for one device, paging through the API.
+
+        Parameters
+        ----------
+        device_id : str
+            Identifier of device to fetch history for.
+        index : dict
+            Sensor positions keyed by target name, see helpers.sensor_index.
+
+        Returns
+        -------
+        records : ndarray
+            Historic events of device as EVENT_DTYPE records, in the order of the API pages.
+
+        """
+
+        # some printing
+        print('-- Getting event history for {}'.format(device_id))
+
+        # local copy of filters, as threads page independently
+        history_params = dict(self.history_params, page_token=None)
+
+        # set endpoints for event history
+        event_list_url = self.devices_endpoint + '/' + device_id + '/events'
+
+        # perform paging, next page token is only known once current page is parsed
+        # each page is compacted to records at once, so event jsons never pile up
+        records = []
+        while history_params['page_token'] != '':
+            event_listing = self.session.get(event_list_url, params=history_params)
+            event_json = loads(event_listing.content)
+
+            if event_listing.status_code < 300:
+                history_params['page_token'] = event_json['nextPageToken']
+                records.append(hlp.flatten_history(event_json['events'], self.sensors, index=index))
+            else:
+                print(event_json)
+                hlp.print_error('Status Code: {}'.format(event_listing.status_code), terminate=True)
+
+            if history_params['page_token'] != '':
+                print('\t-- paging')
+
+        return np.concatenate(records)
 
 
     def print_devices_information(self):
@@ -251,13 +349,18 @@ class Director():
         # do nothing if no starttime is given
         if not self.fetch_history:
             return
+
+        # fetch event history, local file is already imported
+        # stream may already have failed, which is reported before and after the lengthy fetch
+        if not self.args['path']:
+            self.__check_stream()
+            self.__fetch_event_history()
+            self.__check_stream()
     
-        # estimate occupancy for history 
-        cc = 0
-        for i, event_data in enumerate(self.event_history):
-            cc = hlp.loop_progress(cc, i, len(self.event_history), 25, name='event history')
-            # serve event to director
-            self.__new_event_data(event_data, cout=False)
+        # replay history for all sensors at once
+        print('-- Replaying {} events'.format(len(self.event_history)))
+        replay(list(self.sensors.values()), self.event_history['sensor_idx'], self.event_history['ux'], self.event_history['y'])
+        self.history_ux = {device_id: sensor.temperature_ux[-1] for device_id, sensor in self.sensors.items() if sensor.n_samples > 0}
     
         # initialise plot
         if self.args['plot']:
@@ -269,14 +372,38 @@ class Director():
             self.plot_debug()
 
 
+    def open_stream(self, n_reconnects=5):
+        """
+        Connect to stream and start receiving events in the background, without serving them yet.
+        Opening the stream before running history keeps events arriving while history is fetched.
+        Does nothing if stream is already open.
+
+        Parameters
+        ----------
+        n_reconnects : int
+            Number of retries if connection lost.
+
+        """
+
+        # don't run if local file
+        if self.args['path'] or self.stream_receiver is not None:
+            return
+
+        # receive events in the background until reconnection attempts run out
+        self.stream_receiver = threading.Thread(target=self.__receive_stream, args=(self.stream_events, n_reconnects), daemon=True)
+        self.stream_receiver.start()
+
+
     def run_stream(self, n_reconnects=5):
         """
         Stream events for sensors in project.
+        Events are received in a separate thread and served to sensors here,
+        so that waiting on the connection never holds back processing or plotting.
     
         Parameters
         ----------
         n_reconnects : int
-            Number of retries if connection lost.
+            Number of retries if connection lost, unless stream is already open.
 
         """
 
@@ -292,29 +419,124 @@ class Director():
             self.initialise_plot()
             self.plot_progress(blocking=False)
     
+        # sensors updated since last frame, frames are drawn on a fixed interval independent of events
+        plot_pending = set()
+        plot_time    = time.monotonic()
+
+        # receive events in the background, if not already started
+        self.open_stream(n_reconnects)
+        events = self.stream_events
+
+        # bind names used for every event locally, they are constant while streaming
+        plot      = self.args['plot']
+        interval  = params.S_PLOT_INTERVAL
+        n_batch   = params.N_STREAM_BATCH
+        monotonic = time.monotonic
+        get       = events.get
+        get_now   = events.get_nowait
+        new_batch = self.__new_event_batch
+        receiver  = self.stream_receiver
+
+        # from here on, receiver drops events if serving falls behind
+        self.stream_serving.set()
+
+        # serve events as they arrive, waking up at least once per frame
+        while receiver.is_alive() or not events.empty():
+            try:
+                batch = [get(timeout=max(0, plot_time + interval - monotonic()))]
+
+                # events arriving in a burst are served together
+                while len(batch) < n_batch and not events.empty():
+                    batch.append(get_now())
+
+                # serve events to director
+                updated = new_batch(batch)
+                if plot:
+                    plot_pending.update(updated)
+            except queue.Empty:
+                pass
+
+            # draw frame when due, also when nothing changed, which keeps the plot window responsive
+            if monotonic() - plot_time >= interval:
+                if plot:
+                    self.plot_progress(blocking=False, source_ids=plot_pending)
+                    plot_pending = set()
+                plot_time = monotonic()
+
+        # receiver has stopped, terminate if it failed on an error that retrying will not fix
+        self.__check_stream()
+
+
+    def __check_stream(self):
+        """
+        Terminate if stream receiver stopped on an error that retrying will not fix.
+        Exiting from the receiver thread itself would only end that thread.
+
+        """
+
+        if self.stream_error is not None:
+            hlp.print_error(self.stream_error, terminate=True)
+
+
+    def __receive_stream(self, events, n_reconnects):
+        """
+        Connect to stream and put received event_data jsons on a queue.
+        Runs in its own thread until reconnection attempts run out.
+        Errors that retrying will not fix are stored in stream_error for the main thread to report.
+
+        Parameters
+        ----------
+        events : queue.Queue
+            Queue receiving event_data jsons.
+        n_reconnects : int
+            Number of retries if connection lost.
+
+        """
+
+        # seconds to wait before next reconnection attempt, doubled for every failed attempt
+        wait = 1
+
+        # bind names used for every event locally
+        put      = events.put
+        sse_data = hlp.sse_data
+        serving  = self.stream_serving
+
         # loop indefinetly
         nth_reconnect = 0
         while nth_reconnect < n_reconnects:
             try:
-                # reset reconnect counter
-                nth_reconnect = 0
-        
-                # get response
-                response = requests.get(self.stream_endpoint, auth=(self.username, self.password), headers={'accept':'text/event-stream'}, stream=True, params=self.stream_params)
-                client = sseclient.SSEClient(response)
-        
-                # listen for events
-                print('Connected.')
-                for event in client.events():
-                    # new data received
-                    event_data = json.loads(event.data)['result']['event']
-        
-                    # serve event to director
-                    self.__new_event_data(event_data)
-        
-                    # plot progress
-                    if self.args['plot']:
-                        self.plot_progress(blocking=False)
+                # get response, closed on the way out so the session can reuse its connection
+                with self.session.get(self.stream_url, headers=self.stream_headers, stream=True) as response:
+
+                    # bad credentials will not fix themselves, so stop and leave termination to main thread
+                    if response.status_code in (401, 403):
+                        self.stream_error = 'Status Code: {}, check credentials.'.format(response.status_code)
+                        return
+
+                    # other error statuses count as failed attempts
+                    response.raise_for_status()
+
+                    # listen for events, parsing data straight from bytes
+                    print('Connected.')
+                    for data in sse_data(response.iter_content(chunk_size=None)):
+                        # new data received, a malformed package does not affect the connection
+                        try:
+                            event_data = loads(data)['result']['event']
+                        except (KeyError, ValueError):
+                            print('Error in event package. Skipping...')
+                            print(data)
+                            print()
+                            continue
+
+                        # hand event to main thread, never holding back the connection if serving falls behind
+                        if serving.is_set() and events.qsize() >= params.N_STREAM_QUEUE:
+                            print('Event queue full, dropping event.')
+                        else:
+                            put(event_data)
+
+                        # connection works, so reset reconnect counter and retry next failure quickly
+                        nth_reconnect = 0
+                        wait = 1
             
             except requests.exceptions.ConnectionError:
                 nth_reconnect += 1
@@ -322,37 +544,78 @@ class Director():
             except requests.exceptions.ChunkedEncodingError:
                 nth_reconnect += 1
                 print('An error occured, reconnection attempt {}/{}'.format(nth_reconnect, n_reconnects))
-            except KeyError:
-                print('Error in event package. Skipping...')
-                print(event_data)
-                print()
-            
-            # wait 1s before attempting to reconnect
-            time.sleep(1)
+            except requests.exceptions.HTTPError as error:
+                nth_reconnect += 1
+                print('Status Code: {}, reconnection attempt {}/{}'.format(error.response.status_code, nth_reconnect, n_reconnects))
+            except Exception as error:
+                # unexpected errors would otherwise end thread silently, so leave termination to main thread
+                self.stream_error = 'Stream receiver stopped, {}: {}'.format(type(error).__name__, error)
+                return
+
+            # back off exponentially while connection keeps failing
+            time.sleep(wait)
+            wait = min(2*wait, params.S_RECONNECT_MAX)
 
 
-    def __new_event_data(self, event_data, cout=True):
-        """Receive new event_data json and pass it along to the correct device object.
+    def __new_event_batch(self, batch, cout=True):
+        """
+        Receive several event_data jsons and pass them along to the correct device objects,
+        iterating each sensor once for all its events.
 
         Parameters
         ----------
-        event_data : dictionary 
-            Data json containing new event data.
+        batch : list
+            Data jsons containing new event data, in order of arrival.
         cout : bool 
             Print device information to console if True.
 
-        """
+        Returns
+        -------
+        source_ids : set
+            Identifiers of sensors that received events.
 
-        # get id of source sensor
-        source_id = os.path.basename(event_data['targetName'])
+        """
 
-        # verify temperature event
-        if 'temperature' in event_data['data'].keys():
-            # check if source device is known
-            if source_id in self.sensors.keys():
-                # serve event to desk
-                self.sensors[source_id].new_event_data(event_data)
-                if cout: print('-- {:<30}'.format(source_id))
+        # unpack temperature events of known sensors to parallel arrays, parsing all timestamps at once
+        sensors, timestamps, values = [], [], []
+        for event_data in batch:
+            sensor      = self.sensor_targets.get(event_data['targetName'])
+            temperature = event_data['data'].get('temperature')
+            if sensor is not None and temperature is not None:
+                sensors.append(sensor)
+                timestamps.append(temperature['updateTime'])
+                values.append(temperature['value'])
+        batch_ux = hlp.timestamps_to_ux(timestamps)
+        batch_y  = np.array(values, dtype=float)
+
+        # group positions by sensor, keeping order of arrival
+        grouped = {}
+        for i, sensor in enumerate(sensors):
+            grouped.setdefault(sensor, []).append(i)
+
+        # serve each sensor all its events at once
+        source_ids = set()
+        for sensor, positions in grouped.items():
+            ux = batch_ux[positions]
+            y  = batch_y[positions]
+
+            # skip stream events also fetched as history
+            keep = ux > self.history_ux.get(sensor.device_id, np.iinfo(np.int64).min)
+
+            # skip events older than those already served, which would break time order
+            # timestamps are truncated to seconds, so events sharing a second with the previous one are kept
+            newest = sensor.temperature_ux[-1] if sensor.n_samples > 0 else np.iinfo(np.int64).min
+            keep  &= ux >= np.maximum.accumulate(np.concatenate(([newest], ux[:-1])))
+            if not keep.any():
+                continue
+
+            sensor.batch_iterate(ux[keep], y[keep])
+            source_ids.add(sensor.device_id)
+            if cout:
+                for _ in range(keep.sum()):
+                    print('-- {:<30}'.format(sensor.device_id))
+
+        return source_ids
 
 
     def plot_debug(self):
@@ -361,6 +624,8 @@ class Director():
 
         """
 
+        import matplotlib.pyplot as plt
+
         print('\nDEBUG')
         print('Close plot to see next sensor.')
 
@@ -372,8 +637,13 @@ class Director():
             # reinitialise debug figure
             self.initialise_debug_plot()
 
-            self.dax[0].plot(hlp.ux_to_dt(sensor.temperature_ux), sensor.temperature_y, color=stl.wheel[0],       label='Temperature')
-            self.dax[0].plot(hlp.ux_to_dt(sensor.level_ux),       sensor.level_y,       color='k', linewidth=2.5, label='Baseline')
+            # convert timeaxes once
+            temperature_dt = hlp.ux_to_dt(sensor.temperature_ux)
+            level_dt       = hlp.ux_to_dt(sensor.level_ux)
+            bound_dt       = hlp.ux_to_dt(sensor.upper_bound_ux)
+
+            self.dax[0].plot(temperature_dt, sensor.temperature_y, color=stl.wheel[0],       label='Temperature')
+            self.dax[0].plot(level_dt,       sensor.level_y,       color='k', linewidth=2.5, label='Baseline')
             self.dax[0].set_xlabel('Time')
             self.dax[0].axvline(hlp.ux_to_dt(sensor.level_ux[-1]), color='k')
             self.dax[0].axvline(hlp.ux_to_dt(sensor.level_ux[-1]+params.S_DELAY), color='k', linestyle='--', label='Median Window')
@@ -381,42 +651,34 @@ class Director():
             self.dax[0].set_ylabel('Temperature')
             self.dax[0].legend(loc='upper left')
 
-            self.dax[1].fill_between(hlp.ux_to_dt(sensor.upper_bound_ux), sensor.upper_bound_y, sensor.lower_bound_y, alpha=0.33, color=stl.wheel[0], label='Envelope')
-            self.dax[1].plot(hlp.ux_to_dt(sensor.temperature_ux), sensor.temperature_y, color=stl.wheel[0],       label='Temperature')
-            self.dax[1].plot(hlp.ux_to_dt(sensor.level_ux),       sensor.level_y,       color='k', linewidth=2.5, label='Baseline')
-            self.dax[2].get_shared_x_axes().join(self.dax[1], self.dax[2])
+            self.dax[1].fill_between(bound_dt, sensor.upper_bound_y, sensor.lower_bound_y, alpha=0.33, color=stl.wheel[0], label='Envelope')
+            self.dax[1].plot(temperature_dt, sensor.temperature_y, color=stl.wheel[0],       label='Temperature')
+            self.dax[1].plot(level_dt,       sensor.level_y,       color='k', linewidth=2.5, label='Baseline')
 
-            t1 = sensor.temperature_ux[0]
-            t2 = sensor.level_ux[-1]
-            diff_y = np.array(sensor.temperature_y)[np.array(sensor.temperature_ux) <= t2]
-            diff_y = diff_y - np.array(sensor.level_y[-len(diff_y):])
-            diff_ux = np.array(sensor.level_ux[-len(diff_y):])
-            self.dax[2].plot(hlp.ux_to_dt(diff_ux), diff_y, color=stl.wheel[0],       label='Differentiated')
+            # difference between temperature and baseline
+            level_ux = sensor.level_ux
+            diff_y = sensor.temperature_y[sensor.temperature_ux <= level_ux[-1]]
+            diff_y = diff_y - sensor.level_y[-len(diff_y):]
+            diff_ux = level_ux[-len(diff_y):]
+            diff_dt = hlp.ux_to_dt(diff_ux)
+            self.dax[2].plot(diff_dt, diff_y, color=stl.wheel[0],       label='Differentiated')
+
+            # extrema of all robust windows in one pass
+            t2 = level_ux[-1] - params.S_ROBUST_CYCLE*np.arange(params.N_ROBUST_IN_BOUNDS)
+            t1 = t2 - params.S_ROBUST_WIDTH
+            starts, stops, maxvals, minvals = hlp.window_extrema(diff_ux, diff_y, t1, t2)
 
             for i in range(params.N_ROBUST_IN_BOUNDS):
-                t2 = sensor.level_ux[len(sensor.level_ux)-1]-params.S_ROBUST_CYCLE*(i)
-                t1 = sensor.level_ux[len(sensor.level_ux)-1]-params.S_ROBUST_CYCLE*(i)-params.S_ROBUST_WIDTH
-            
-                yy = diff_y[(diff_ux >= t1) & (diff_ux <= t2)]
-                xx = hlp.ux_to_dt(diff_ux[(diff_ux >= t1) & (diff_ux <= t2)])
+                xx = diff_dt[starts[i]:stops[i]]
                 if len(xx) > 0:
-                    maxval = np.ones(len(xx))*max(yy)
                     lx = [xx[0], xx[0]]
-                    ly = [maxval[0]-0.5, maxval[0]+0.5]
                     rx = [xx[-1], xx[-1]]
-                    ry = [maxval[0]-0.5, maxval[0]+0.5]
-                    self.dax[2].plot(xx, maxval, color=stl.wheel[1])
-                    self.dax[2].plot(lx, ly, color=stl.wheel[1], linewidth=2)
-                    self.dax[2].plot(rx, ry, color=stl.wheel[1], linewidth=2)
-            
-                    minval = np.ones(len(xx))*min(yy)
-                    lx = [xx[0], xx[0]]
-                    ly = [minval[0]-0.5, minval[0]+0.5]
-                    rx = [xx[-1], xx[-1]]
-                    ry = [minval[0]-0.5, minval[0]+0.5]
-                    self.dax[2].plot(xx, minval, color=stl.wheel[1])
-                    self.dax[2].plot(lx, ly, color=stl.wheel[1], linewidth=2)
-                    self.dax[2].plot(rx, ry, color=stl.wheel[1], linewidth=2)
+                    for extremum in [maxvals[i], minvals[i]]:
+                        ly = [extremum-0.5, extremum+0.5]
+                        ry = [extremum-0.5, extremum+0.5]
+                        self.dax[2].plot(xx, np.ones(len(xx))*extremum, color=stl.wheel[1])
+                        self.dax[2].plot(lx, ly, color=stl.wheel[1], linewidth=2)
+                        self.dax[2].plot(rx, ry, color=stl.wheel[1], linewidth=2)
             self.dax[2].plot(rx, ry, color=stl.wheel[1], linewidth=2, label='Window Extrema')
 
             self.dax[1].set_xlabel('Time')
@@ -429,35 +691,163 @@ class Director():
             plt.show()
 
 
-    def plot_progress(self, blocking):
+    def __fill_bounds(self, ax, bound_dt, upper_bound_y, lower_bound_y, state, animated=False):
+        """
+        Fill bounds envelope and alert regions of a progress plot axis.
+
+        Returns
+        -------
+        bounds : PolyCollection
+            Envelope where state is normal.
+        alert : PolyCollection
+            Full height region where state is alert.
+
+        """
+
+        # state is either 0 or 1, so one mask and its negation covers both fills
+        is_alert = np.asarray(state) == 1
+        bounds = ax.fill_between(bound_dt, upper_bound_y, lower_bound_y, alpha=0.33, color=stl.wheel[0], where=~is_alert, label='Bounds', animated=animated)
+        alert  = ax.fill_between(bound_dt, 0, 1, alpha=0.5, color=stl.wheel[1], where=is_alert, label='Alert', transform=ax.get_xaxis_transform(), animated=animated)
+        return bounds, alert
+
+
+    def __update_limits(self, i, sensor):
+        """
+        Widen axis limits with some headroom when sensor data has grown outside them.
+
+        Returns
+        -------
+        changed : bool
+            True if limits were changed and background must be redrawn.
+
+        """
+
+        # data extent
+        x0 = sensor.level_ux[0]
+        x1 = sensor.temperature_ux[-1]
+        y0 = min(np.nanmin(y) for y in [sensor.temperature_y, sensor.level_y, sensor.lower_bound_y])
+        y1 = max(np.nanmax(y) for y in [sensor.temperature_y, sensor.level_y, sensor.upper_bound_y])
+
+        # keep limits while data fits
+        limits = self.hlimits[i]
+        if limits is not None and limits[0] <= x0 and x1 <= limits[1] and limits[2] <= y0 and y1 <= limits[3]:
+            return False
+
+        # pad with 10% of span to avoid widening on every event
+        xpad = max(0.1*(x1 - x0), params.S_DELAY)
+        ypad = max(0.1*(y1 - y0), 0.5)
+        self.hlimits[i] = (x0 - xpad, x1 + xpad, y0 - ypad, y1 + ypad)
+        self.hax[i].set_xlim(hlp.ux_to_dt(self.hlimits[i][0]), hlp.ux_to_dt(self.hlimits[i][1]))
+        self.hax[i].set_ylim(self.hlimits[i][2], self.hlimits[i][3])
+        return True
+
+
+    def __update_artists(self, i):
+        """
+        Update progress plot artists of one sensor axis with current sensor data.
+
+        Parameters
+        ----------
+        i : int
+            Position of sensor axis.
+
+        Returns
+        -------
+        redraw : bool
+            True if axis limits changed and background must be redrawn.
+
+        """
+
+        import matplotlib.dates as mdates
+
+        sensor  = self.hsensors[i]
+        artists = self.hartists[i]
+
+        # nothing new to show
+        if sensor.n_samples == self.hplotted[i]:
+            return False
+        self.hplotted[i] = sensor.n_samples
+
+        # convert only samples new since last frame
+        converted = len(self.hdatenum[i])
+        if converted < sensor.n_samples:
+            tail = mdates.date2num(hlp.ux_to_dt(sensor.temperature_ux[converted:]))
+            self.hdatenum[i] = np.concatenate((self.hdatenum[i], tail))
+
+        # level and bounds lag temperature by exactly the delay
+        temperature_x = self.hdatenum[i]
+        level_x       = temperature_x - params.S_DELAY / (60*60*24)
+        delay_x       = level_x[-1]
+
+        # filled regions can not be updated in place, so replace them
+        artists['bounds'].remove()
+        artists['alert'].remove()
+        artists['bounds'], artists['alert'] = self.__fill_bounds(self.hax[i], level_x, sensor.upper_bound_y, sensor.lower_bound_y, sensor.state, animated=True)
+
+        # widen limits if needed
+        redraw = self.__update_limits(i, sensor)
+
+        # update line segments in place, delay line spans the y limits
+        artists['lines'].set_segments([
+            np.column_stack((temperature_x, sensor.temperature_y)),
+            np.column_stack((level_x, sensor.level_y)),
+            [(delay_x, self.hlimits[i][2]), (delay_x, self.hlimits[i][3])],
+        ])
+
+        return redraw
+
+
+    def plot_progress(self, blocking, source_ids=None):
         """
         Plot a progress plot illustrating estimated thresholds and outliers.
+        Only artists are redrawn and blitted onto a cached background,
+        which is redrawn when axis limits change.
+
+        Parameters
+        ----------
+        blocking : bool
+            Show a regular blocking plot if True.
+        source_ids : iterable, optional
+            Only update the axes of these sensors if given.
 
         """
 
-        # iterate sensors
-        for i, sid in enumerate(self.sensors.keys()):
-            self.hax[i].cla()
-            sensor = self.sensors[sid]
+        import matplotlib.pyplot as plt
 
-            if len(sensor.temperature_ux) > 0:
-                C = stl.wheel[0]
-                A = stl.wheel[1]
-                state = np.array(sensor.state)
-
-                self.hax[i].plot(hlp.ux_to_dt(sensor.temperature_ux), sensor.temperature_y, color=C, label='Temperature')
-                self.hax[i].plot(hlp.ux_to_dt(sensor.level_ux), sensor.level_y, '-k', linewidth=2)
-                self.hax[i].fill_between(hlp.ux_to_dt(sensor.upper_bound_ux), sensor.upper_bound_y, sensor.lower_bound_y, alpha=0.33, color=C, where=(state==0), label='Bounds')
-                self.hax[i].fill_between(hlp.ux_to_dt(sensor.upper_bound_ux), 0, 1, alpha=0.5, color=A, where=(state==1), label='Alert', transform=self.hax[i].get_xaxis_transform())
-                self.hax[i].axvline(hlp.ux_to_dt(sensor.temperature_ux[-1] - params.S_DELAY), color='k')
-                self.hax[i].legend(loc='upper right')
-                self.hax[i].set_ylabel('Temperature [deg]')
-            self.hax[i].legend(loc='upper left')
-        self.hax[-1].set_xlabel('Time')
+        canvas = self.hfig.canvas
+        redraw = self.hbackground is None or blocking
+
+        # axes with new data
+        if source_ids is None:
+            updated = range(len(self.hsensors))
+        else:
+            updated = [self.hindex[source_id] for source_id in source_ids]
+
+        # update artists of changed sensors
+        for i in updated:
+            redraw = self.__update_artists(i) or redraw
 
         if blocking:
+            # draw everything in a regular blocking plot
             self.hax[0].set_title('Blocking')
+            for artists in self.hartists:
+                for artist in artists.values():
+                    artist.set_animated(False)
             plt.show()
-        else:
+            return
+
+        if redraw:
+            # redraw and cache background without animated artists, which must then all be blitted
             self.hax[0].set_title('Non-Blocking')
-            plt.pause(0.01)
+            plt.show(block=False)
+            canvas.draw()
+            self.hbackground = [canvas.copy_from_bbox(ax.bbox) for ax in self.hax]
+            updated = range(len(self.hsensors))
+
+        # blit artists on top of cached background
+        for i in updated:
+            canvas.restore_region(self.hbackground[i])
+            for artist in sorted(self.hartists[i].values(), key=lambda artist: artist.get_zorder()):
+                self.hax[i].draw_artist(artist)
+            canvas.blit(self.hax[i].bbox)
+        canvas.flush_events()
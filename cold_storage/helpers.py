@@ -1,31 +1,69 @@
 # packages
 import sys
 import numpy  as np
-import pandas as pd
 
+# optional packages
+try:
+    import numba
+except ImportError:
+    numba = None
 
-def convert_event_data_timestamp(ts):
+# parallel range in compiled functions, plain range without numba
+prange = range if numba is None else numba.prange
+
+# DT API timestamp format, always UTC
+API_TIMESTAMP_FORMAT = '%Y-%m-%dT%H:%M:%SZ'
+
+# compact event record, see flatten_history
+EVENT_DTYPE = np.dtype([
+    ('sensor_idx', np.int32),   # position of source sensor
+    ('ux',         np.int64),   # unixtime
+    ('y',          np.float64), # temperature value
+])
+
+
+def njit(*args, **kwargs):
     """
-    Convert the default event_data timestamp format to Pandas and unixtime format.
+    Compile decorated function with numba in nopython mode if installed.
+    Without numba, the function is returned as is and runs in Python.
 
     Parameters
     ----------
-    ts : str 
-        API event_data timestamp format.
+    *args
+        Optional explicit signature passed on to numba.njit, compiling at import instead of first call.
+    **kwargs
+        Keyword arguments passed on to numba.njit.
 
     Returns
     -------
-    timestamp : datetime 
-        Pandas Timestamp object format.
-    unixtime : int 
-        Integer number of seconds since 1 January 1970.
+    decorator : function
+        Decorator returning the compiled or unchanged function.
 
     """
 
-    timestamp = pd.to_datetime(ts)
-    unixtime  = pd.to_datetime(np.array([ts])).astype(int)[0] // 10**9
+    if numba is None:
+        return lambda function: function
+    return numba.njit(*args, **kwargs)
+
+
+def timestamps_to_ux(timestamps):
+    """
+    Convert many event_data timestamps to unixtime at once.
+
+    Parameters
+    ----------
+    timestamps : list
+        API event_data timestamps, always UTC.
+
+    Returns
+    -------
+    ux : ndarray
+        Integer number of seconds since 1 January 1970 for each timestamp.
 
-    return timestamp, unixtime
+    """
+
+    # numpy parses the ISO date and time of day in C, fraction and 'Z' are dropped, truncating to whole seconds
+    return np.array([ts[:19] for ts in timestamps], dtype='datetime64[s]').astype(np.int64)
 
 
 def ux_to_dt(ux):
@@ -34,17 +72,21 @@ def ux_to_dt(ux):
 
     Parameters
     ----------
-    ux : int 
+    ux : int or array_like
         Seconds since 01-01-1970.
 
     returns:
-    dt : datetime 
-        Pandas datetime format.
+    dt : datetime64 or ndarray
+        NumPy datetime64 format, with second resolution.
 
     """
 
-    # create datetime
-    dt = pd.to_datetime(ux, unit='s')
+    # reinterpret seconds as datetime in one vectorized cast
+    dt = np.asarray(ux, dtype=np.int64).astype('datetime64[s]')
+
+    # unpack scalars
+    if dt.ndim == 0:
+        dt = dt[()]
 
     return dt
 
@@ -64,75 +106,52 @@ def print_error(text, terminate=True):
 
     print('ERROR: {}'.format(text))
     if terminate:
-        sys.exit()
-
-
-def loop_progress(i_track, i, n_max, n_steps, name=None, acronym=' '):
-    """
-    Print progress to console
-
-    Parameters
-    ----------
-    i_track : int 
-        Progress tracker.
-        Tracks relative progress in loop and must therefore be returned.
-    i : int 
-        Current loop index.
-    n_max : int 
-        Loop end value.
-    n_steps : int 
-        Number of steps printed in loop.
-
-    """
-
-    # number of indices in each progress element
-    part = n_max / n_steps
-
-    if i_track == 0:
-        # print empty bar
-        print('    |')
-        if name is None:
-            print('    └── Progress:')
-        else:
-            print('    └── {}:'.format(name))
-        print('        ├── [ ' + (n_steps-1)*'-' + ' ] ' + acronym)
-        i_track = 1
-    elif i > i_track + part:
-        # update tracker
-        i_track = i_track + part
-
-        # print bar
-        print('        ├── [ ' + int(i_track/part)*'#' + (n_steps - int(i_track/part) - 1)*'-' + ' ] ' + acronym)
+        sys.exit(1)
 
-    # return tracker
-    return i_track
 
-
-def dt_timestamp_format(tx):
+def window_extrema(ux, y, t1, t2):
     """
-    Convert datetime object to DT timestamp format.
+    Find maximum and minimum value of several time windows in one pass.
 
     Parameters
     ----------
-    tx : datetime 
-        Pandas datetime object.
+    ux : array_like
+        Sorted unixtime axis of y.
+    y : array_like
+        Values to find extrema of.
+    t1 : array_like
+        Unixtime start of each window, inclusive.
+    t2 : array_like
+        Unixtime end of each window, inclusive.
 
     Returns
     -------
-    dtt : str 
-        API timestamp format.
+    starts : ndarray
+        Index of first sample in each window.
+    stops : ndarray
+        Index after last sample in each window.
+    maxvals : ndarray
+        Maximum value in each window, NaN if window is empty.
+    minvals : ndarray
+        Minimum value in each window, NaN if window is empty.
 
     """
 
-    year   = '{:04}'.format(tx.year)
-    month  = '{:02}'.format(tx.month)
-    day    = '{:02}'.format(tx.day)
-    hour   = '{:02}'.format(tx.hour)
-    minute = '{:02}'.format(tx.minute)
-    second = '{:02}'.format(tx.second)
+    # window bounds as slice indices
+    starts = np.searchsorted(ux, t1, side='left')
+    stops  = np.searchsorted(ux, t2, side='right')
+    valid  = stops > starts
+
+    # interleave start and stop indices for reduceat
+    # pad y so that a stop index at the very end is still valid
+    y_pad   = np.append(np.asarray(y, dtype=float), np.nan)
+    indices = np.column_stack((starts, stops)).ravel()
+
+    # extrema of [start, stop), every second output is the gap between windows
+    maxvals = np.where(valid, np.maximum.reduceat(y_pad, indices)[::2], np.nan)
+    minvals = np.where(valid, np.minimum.reduceat(y_pad, indices)[::2], np.nan)
 
-    dtt = year + '-' + month + '-' + day + 'T' + hour + ':' + minute + ':' + second + 'Z'
-    return dtt
+    return starts, stops, maxvals, minvals
 
 
 def api_json_format(timestamp, temperature):
@@ -182,8 +201,8 @@ def import_as_event_history(path):
 
     """
 
-    # initialise output list
-    events = []
+    # pandas is only imported when reading a local file
+    import pandas as pd
 
     # import through pandas dataframe
     df = pd.read_csv(path)
@@ -192,38 +211,155 @@ def import_as_event_history(path):
     if not 'temperature' in df.columns or not 'unix_time' in df.columns:
         print_error('Imported file should have columns \'temperature\' and \'unix_time\'.')
 
-    # extract UTC timestamps
-    tx = pd.to_datetime(df['unix_time'], unit='s')
+    # convert all unixtimes to DT format at once
+    timestamps = pd.to_datetime(df['unix_time'], unit='s').dt.strftime(API_TIMESTAMP_FORMAT).tolist()
 
-    # iterate events
-    for i in range(len(df)):
-        # convert unixtime to DT format
-        timestamp = dt_timestamp_format(tx[i])
+    # create event json format
+    events = [api_json_format(timestamp, temperature) for timestamp, temperature in zip(timestamps, df['temperature'].tolist())]
 
-        # create event json format
-        json = api_json_format(timestamp, df['temperature'].iloc[i])
+    return events
 
-        # append output
-        events.append(json)
 
-    return events
+def sensor_index(sensors):
+    """
+    Map event target names to sensor positions.
+
+    Parameters
+    ----------
+    sensors : dict
+        Sensor objects keyed by device identifier.
 
+    Returns
+    -------
+    index : dict
+        Position in sensors keyed by both full resource name and device identifier.
 
-def json_sort_key(json):
     """
-    Return the event update time converted to unixtime.
+
+    index = {}
+    for i, (device_id, sensor) in enumerate(sensors.items()):
+        index[device_id] = i
+        if 'name' in sensor.device:
+            index[sensor.device['name']] = i
+
+    return index
+
+
+def flatten_history(events, sensors, ux=None, index=None):
+    """
+    Compact temperature events to records of sensor index, unixtime and temperature.
+    Events from sensors not in sensors are skipped.
 
     Parameters
-    json : dict 
-        Event data json.
+    ----------
+    events : list
+        List of event jsons, sorted in time.
+    sensors : dict
+        Sensor objects keyed by device identifier.
+    ux : ndarray, optional
+        Unixtime of each event, parsed from timestamps if not given.
+    index : dict, optional
+        Result of sensor_index for sensors, built if not given.
 
     Returns
     -------
-    unixtime : int 
-        Seconds since 01-01-1970.
+    records : ndarray
+        Structured array of EVENT_DTYPE, one record per kept event.
+
+    """
+
+    # map target name, as full resource name or device identifier, to position
+    if index is None:
+        index = sensor_index(sensors)
+
+    sensor_idx, keep, y = [], [], []
+    for i, event in enumerate(events):
+        position    = index.get(event['targetName'])
+        temperature = event['data'].get('temperature')
+        if temperature is not None and position is not None:
+            sensor_idx.append(position)
+            keep.append(i)
+            y.append(temperature['value'])
+
+    # parse timestamps of kept events only when not already known
+    if ux is None:
+        ux = timestamps_to_ux([events[i]['data']['temperature']['updateTime'] for i in keep])
+    else:
+        ux = np.asarray(ux)[keep]
+
+    # fill records
+    records = np.empty(len(keep), dtype=EVENT_DTYPE)
+    records['sensor_idx'] = sensor_idx
+    records['ux']         = ux
+    records['y']          = y
+
+    return records
+
+
+def merge_records(device_records):
+    """
+    Merge the event records of several devices, grouped by sensor and sorted in time within each group.
+
+    Parameters
+    ----------
+    device_records : list
+        EVENT_DTYPE records arrays.
+
+    Returns
+    -------
+    records : ndarray
+        Records of all devices sorted by sensor index, then unixtime.
+        Events of a sensor at the same unixtime keep their order.
+
+    """
+
+    records = np.concatenate(device_records) if device_records else np.empty(0, dtype=EVENT_DTYPE)
+    return records[np.lexsort((records['ux'], records['sensor_idx']))]
+
+
+def sse_data(chunks):
+    """
+    Split a Server-Sent Events byte stream into the data field of each event.
+    Data is kept as bytes, which json parsers accept without decoding to str first.
+
+    Parameters
+    ----------
+    chunks : iterable
+        Byte chunks of stream as received, events may span several chunks.
+
+    Yields
+    ------
+    data : bytes
+        Data of one event, multiple data lines joined by newline.
+        Events without data, such as keep-alive comments, are skipped.
 
     """
 
-    timestamp = json['data']['temperature']['updateTime']
-    _, unixtime = convert_event_data_timestamp(timestamp)
-    return unixtime
+    buffer = bytearray()
+    for chunk in chunks:
+        # resume search one byte back, an empty line may span two chunks
+        start   = max(len(buffer) - 1, 0)
+        buffer += chunk
+
+        # line endings may also be CRLF, only normalized when present
+        if b'\r' in buffer:
+            buffer = buffer.replace(b'\r\n', b'\n')
+            start  = 0
+
+        # events are separated by an empty line, remainder is incomplete until next chunk
+        consumed = 0
+        end = buffer.find(b'\n\n', start)
+        while end >= 0:
+            if buffer.startswith(b'data: ', consumed) and buffer.find(b'\n', consumed, end) < 0:
+                # common case of a single data line, sliced out directly
+                yield bytes(buffer[consumed+6:end])
+            else:
+                frame = bytes(buffer[consumed:end])
+                data  = [line[5:] for line in frame.split(b'\n') if line.startswith(b'data:')]
+                if data:
+                    # a single space after the colon is not part of the value
+                    yield b'\n'.join(line[1:] if line.startswith(b' ') else line for line in data)
+
+            consumed = end + 2
+            end = buffer.find(b'\n\n', consumed)
+        del buffer[:consumed]
@@ -5,6 +5,51 @@ import numpy             as np
 import config.parameters    as params
 import cold_storage.helpers as helpers
 
+# sensor buffers, in the argument order of iterate_kernel
+BUFFERS = [
+    ('temperature_ux', np.int64),
+    ('temperature_y',  np.float64),
+    ('level_ux',       np.int64),
+    ('level_y',        np.float64),
+    ('level_window',   np.float64),
+    ('robust_ux',      np.int64),
+    ('minval_y',       np.float64),
+    ('maxval_y',       np.float64),
+    ('mad_y',          np.float64),
+    ('upper_offset_y', np.float64),
+    ('lower_offset_y', np.float64),
+    ('bound_ux',       np.int64),
+    ('upper_bound_y',  np.float64),
+    ('lower_bound_y',  np.float64),
+    ('state',          np.int8),
+]
+
+# numba argument types of kernels, which are compiled for these when imported
+# buffers are contiguous, counters and time parameters integer and remaining parameters float
+BUFFER_TYPES    = ', '.join('{}[::1]'.format(np.dtype(dtype).name) for _, dtype in BUFFERS)
+PARAMETER_TYPES = 'int64, int64, int64, int64, float64, float64, float64'
+
+
+def _view(buffer, count):
+    """
+    Create a read-only attribute returning the filled part of a buffer.
+
+    Parameters
+    ----------
+    buffer : str
+        Attribute name of preallocated buffer.
+    count : str
+        Attribute name of number of values in buffer.
+
+    Returns
+    -------
+    view : property
+        Property returning a view of the buffer up to count.
+
+    """
+
+    return property(lambda self: getattr(self, buffer)[:getattr(self, count)])
+
 
 class Sensor():
     """
@@ -13,135 +58,589 @@ class Sensor():
     When new event_data json is received, iterate algorithm one sample.
     """
 
+    # views of filled containers
+    temperature_ux = _view('_temperature_ux', 'n_samples') # temperature unixtime
+    temperature_y  = _view('_temperature_y',  'n_samples') # temperature values
+    level_ux       = _view('_level_ux',       'n_samples') # level unixtime
+    level_y        = _view('_level_y',        'n_samples') # level values
+    minval_ux      = _view('_robust_ux',      'n_robust')  # minimum temperature unixtime
+    minval_y       = _view('_minval_y',       'n_robust')  # minimum temperature value
+    maxval_ux      = _view('_robust_ux',      'n_robust')  # maximum temperature unixtime
+    maxval_y       = _view('_maxval_y',       'n_robust')  # maximum temperature value
+    mad_ux         = _view('_robust_ux',      'n_robust')  # median absolute deviation unixtime
+    mad_y          = _view('_mad_y',          'n_robust')  # median absolute deviation value
+    upper_bound_ux = _view('_bound_ux',       'n_samples') # upper bound unixtime
+    upper_bound_y  = _view('_upper_bound_y',  'n_samples') # upper bound value
+    lower_bound_ux = _view('_bound_ux',       'n_samples') # lower bound unixtime
+    lower_bound_y  = _view('_lower_bound_y',  'n_samples') # lower bound value
+    state          = _view('_state',          'n_samples') # alert state
+
+
     def __init__(self, device, device_id, args):
         # give to self
         self.device    = device
         self.device_id = device_id
         self.args      = args
 
-        # containers
-        self.temperature_ux = [] # temperature unixtime
-        self.temperature_y  = [] # temperature values
-        self.level_ux       = [] # level unixtime
-        self.level_y        = [] # level values
-        self.minval_ux      = [] # minimum temperature unixtime
-        self.minval_y       = [] # minimum temperature value
-        self.maxval_ux      = [] # maximum temperature unixtime
-        self.maxval_y       = [] # maximum temperature value
-        self.mad_ux         = [] # median absolute deviation unixtime
-        self.mad_y          = [] # median absolute deviation value
-        self.upper_bound_ux = [] # upper bound unixtime
-        self.upper_bound_y  = [] # upper bound value
-        self.lower_bound_ux = [] # lower bound unixtime
-        self.lower_bound_y  = [] # lower bound value
-        self.state          = []
+        # preallocated containers
+        self.__allocate(params.N_BUFFER_INIT)
+
+        # algorithm parameters, looked up once instead of every event
+        self.parameters = kernel_parameters()
 
         # variables
         self.n_samples    = 0 # number of event samples received
+        self.n_robust     = 0 # number of robust samples calculated
         self.robust_cycle = 0 # samples since last robust cycle trigger
+        self.level_start  = 0 # index of first sample in level window
 
 
-    def new_event_data(self, event_data):
+    def __allocate(self, capacity):
         """
-        Receive new event from Director and iterate algorithm.
+        Allocate containers with room for capacity samples, keeping existing values.
 
         Parameters
         ----------
-        event_data : dict 
-            Dictionary containing event information.
+        capacity : int
+            Number of samples each container can hold.
 
         """
 
-        # convert timestamp to unixtime
-        _, unixtime = helpers.convert_event_data_timestamp(event_data['data']['temperature']['updateTime'])
+        for name, dtype in BUFFERS:
+            buffer = np.empty(capacity, dtype=dtype)
+            if hasattr(self, '_' + name):
+                old = getattr(self, '_' + name)
+                buffer[:len(old)] = old
+            setattr(self, '_' + name, buffer)
+        self.capacity = capacity
 
-        # append self
-        self.temperature_ux.append(unixtime)
-        self.temperature_y.append(event_data['data']['temperature']['value'])
-        self.n_samples += 1
+        # kernel argument list, only changes when containers are reallocated
+        self.__buffers = [getattr(self, '_' + name) for name, _ in BUFFERS]
 
-        # iterate algorithm
-        self.iterate()
 
+    def buffers(self):
+        """
+        Return all containers in the order of BUFFERS.
+
+        Returns
+        -------
+        buffers : list
+            Preallocated container arrays, including unfilled part.
 
-    def iterate(self):
         """
-        Iterate algorithm for new event data.
 
+        return self.__buffers
+
+
+    def load_history(self, buffers, n_samples, n_robust, robust_cycle, level_start):
         """
+        Set algorithm state from a history replayed outside the object.
 
-        # calculate level as median of delay window
-        delay_window = np.array(self.temperature_y)[self.temperature_ux > self.temperature_ux[-1] - 2*params.S_DELAY]
-        if len(delay_window) > 0:
-            # append level
-            self.level_ux.append(self.temperature_ux[-1] - params.S_DELAY)
-            self.level_y.append(np.median(delay_window))
-
-        # robust sampling back in time
-        if self.temperature_ux[-1] - self.robust_cycle > params.S_ROBUST_CYCLE:
-            self.robust_sampling()
-
-        # calculate bounds
-        n_bounds = min(len(self.mad_y), params.N_ROBUST_IN_BOUNDS)
-        if n_bounds > 0:
-            # calculate bounds
-            upper_value = max(params.BOUND_MINVAL, np.median(np.array(self.maxval_y[-n_bounds:])) + np.median(np.array(self.mad_y[-n_bounds:]))*params.MMAD)
-            lower_value = min(-params.BOUND_MINVAL, np.median(np.array(self.minval_y[-n_bounds:])) - np.median(np.array(self.mad_y[-n_bounds:]))*params.MMAD)
-
-            # add level to bound
-            upper_value = self.level_y[-1] + upper_value
-            lower_value = self.level_y[-1] + lower_value
-
-            # append calculated bounds
-            self.upper_bound_ux.append(self.temperature_ux[-1] - params.S_DELAY)
-            self.upper_bound_y.append(upper_value)
-            self.lower_bound_ux.append(self.temperature_ux[-1] - params.S_DELAY)
-            self.lower_bound_y.append(lower_value)
-        else:
-            # just pad with temperature values
-            self.upper_bound_ux.append(self.temperature_ux[-1] - params.S_DELAY)
-            self.upper_bound_y.append(self.temperature_y[-1])
-            self.lower_bound_ux.append(self.temperature_ux[-1] - params.S_DELAY)
-            self.lower_bound_y.append(self.temperature_y[-1])
+        Parameters
+        ----------
+        buffers : list
+            Filled container arrays in the order of BUFFERS.
+        n_samples : int
+            Number of samples in buffers.
+        n_robust : int
+            Number of robust samples in buffers.
+        robust_cycle : int
+            Unixtime of last robust cycle trigger.
+        level_start : int
+            Index of first sample in level window.
 
-        # set alert state
-        self.set_state()
+        """
 
+        # make room for replayed history and the stream to follow
+        self.__allocate(max(params.N_BUFFER_INIT, 2*n_samples))
+        for own, buffer in zip(self.buffers(), buffers):
+            own[:n_samples] = buffer[:n_samples]
 
-    def set_state(self):
+        self.n_samples    = n_samples
+        self.n_robust     = n_robust
+        self.robust_cycle = robust_cycle
+        self.level_start  = level_start
+
+
+    def batch_iterate(self, ux, y):
         """
-        Set own alert state based on level value.
+        Append several samples at once and iterate algorithm over all of them in one compiled loop.
+        Gives the same result as receiving the samples one event at a time.
+
+        Parameters
+        ----------
+        ux : ndarray
+            Unixtime of each sample, sorted in time and not older than samples already received.
+        y : ndarray
+            Temperature value of each sample.
 
         """
-        if self.level_y[-1] > params.STORAGE_MAXTEMP:
-            self.state.append(1)
+
+        n_start = self.n_samples
+        n_end   = n_start + len(ux)
+
+        # grow containers to fit batch
+        if n_end > self.capacity:
+            self.__allocate(max(2*self.capacity, n_end))
+
+        # append self
+        self._temperature_ux[n_start:n_end] = ux
+        self._temperature_y[n_start:n_end]  = y
+        self.n_samples = n_end
+
+        # iterate algorithm
+        self.n_robust, self.robust_cycle, self.level_start = batch_kernel(
+            *self.__buffers, n_start, n_end, self.n_robust, self.robust_cycle, self.level_start, *self.parameters,
+        )
+
+
+def kernel_parameters():
+    """
+    Collect algorithm parameters in the argument order of iterate_kernel.
+
+    Returns
+    -------
+    parameters : tuple
+        Algorithm parameters from config.parameters.
+
+    """
+
+    return (params.S_DELAY, params.S_ROBUST_CYCLE, params.S_ROBUST_WIDTH, params.N_ROBUST_IN_BOUNDS,
+            params.MMAD, params.BOUND_MINVAL, params.STORAGE_MAXTEMP)
+
+
+def replay(sensors, sensor_idx, ux, y):
+    """
+    Iterate algorithm over the full event history of several sensors at once.
+    Sensors are expected to not have received any events yet.
+
+    Parameters
+    ----------
+    sensors : list
+        Sensor objects to replay history for.
+    sensor_idx : ndarray
+        Index in sensors of each event, sorted so that events are grouped by sensor.
+    ux : ndarray
+        Unixtime of each event, sorted in time within each sensor, see helpers.merge_records.
+    y : ndarray
+        Temperature value of each event.
+
+    """
+
+    # events are already grouped by sensor, so each sensor is a contiguous slice
+    counts  = np.bincount(sensor_idx, minlength=len(sensors))
+    offsets = np.concatenate(([0], np.cumsum(counts)))
+
+    # flat buffers holding all sensors back to back
+    buffers = [np.empty(len(ux), dtype=dtype) for _, dtype in BUFFERS]
+    buffers[0][:] = ux
+    buffers[1][:] = y
+
+    # iterate algorithm over all sensors in parallel
+    n_robust     = np.zeros(len(sensors), dtype=np.int64)
+    robust_cycle = np.zeros(len(sensors), dtype=np.int64)
+    level_start  = np.zeros(len(sensors), dtype=np.int64)
+    replay_kernel(offsets, *buffers, n_robust, robust_cycle, level_start, *kernel_parameters())
+
+    # hand each sensor its part of the buffers
+    for i, sensor in enumerate(sensors):
+        a, b = offsets[i], offsets[i+1]
+        sensor.load_history([buffer[a:b] for buffer in buffers], counts[i], n_robust[i], robust_cycle[i],
+                            level_start[i])
+
+
+@helpers.njit('int64(float64[::1], int64, float64)', cache=True, fastmath=True)
+def sorted_insert(values, count, value):
+    """
+    Insert value into sorted array, shifting larger values one step right.
+
+    Parameters
+    ----------
+    values : ndarray
+        Array sorted up to count, with room for one more value.
+    count : int
+        Number of values in array.
+    value : float
+        Value to insert.
+
+    Returns
+    -------
+    count : int
+        Updated number of values in array.
+
+    """
+
+    k = np.searchsorted(values[:count], value)
+    values[k+1:count+1] = values[k:count].copy()
+    values[k] = value
+    return count + 1
+
+
+@helpers.njit('int64(float64[::1], int64, float64)', cache=True, fastmath=True)
+def sorted_remove(values, count, value):
+    """
+    Remove one occurrence of value from sorted array, shifting larger values one step left.
+
+    Parameters
+    ----------
+    values : ndarray
+        Array sorted up to count, holding value.
+    count : int
+        Number of values in array.
+    value : float
+        Value to remove.
+
+    Returns
+    -------
+    count : int
+        Updated number of values in array.
+
+    """
+
+    k = np.searchsorted(values[:count], value)
+    values[k:count-1] = values[k+1:count].copy()
+    return count - 1
+
+
+@helpers.njit('float64(float64[::1], int64)', cache=True, fastmath=True)
+def sorted_median(values, count):
+    """
+    Median of sorted array, equal to np.median of the same values.
+
+    Parameters
+    ----------
+    values : ndarray
+        Array sorted up to count.
+    count : int
+        Number of values in array.
+
+    Returns
+    -------
+    median : float
+        Median of the count first values.
+
+    """
+
+    h = count // 2
+    if count % 2 == 1:
+        return values[h]
+    return (values[h-1] + values[h]) / 2
+
+
+@helpers.njit('float64(float64[::1])', cache=True, fastmath=True)
+def select_median(values):
+    """
+    Median by quickselect on a copy of values, equal to np.median without sorting them all.
+
+    Parameters
+    ----------
+    values : ndarray
+        Values to find median of, left unchanged.
+
+    Returns
+    -------
+    median : float
+        Median of values.
+
+    """
+
+    a = values.copy()
+    h = len(a) // 2
+
+    # hoare partition around middle element until position h holds its sorted value
+    lo, hi = 0, len(a) - 1
+    while lo < hi:
+        pivot = a[(lo + hi) // 2]
+        i, j = lo, hi
+        while i <= j:
+            while a[i] < pivot:
+                i += 1
+            while a[j] > pivot:
+                j -= 1
+            if i <= j:
+                a[i], a[j] = a[j], a[i]
+                i += 1
+                j -= 1
+        if h <= j:
+            hi = j
+        elif h >= i:
+            lo = i
         else:
-            self.state.append(0)
+            break
 
+    # values left of h are all smaller or equal, the largest is the other middle value
+    if len(a) % 2 == 1:
+        return a[h]
+    return (a[:h].max() + a[h]) / 2
 
-    def robust_sampling(self):
-        """
-        Find maxval, minval and MAD for historic data window.
 
-        """
+@helpers.njit('float64(float64[::1])', cache=True, fastmath=True)
+def small_median(values):
+    """
+    Median of a few values by counting ranks, equal to np.median without copying values.
+    Takes quadratic time, so only meant for the handful of robust samples in bounds.
+
+    Parameters
+    ----------
+    values : ndarray
+        Values to find median of.
+
+    Returns
+    -------
+    median : float
+        Median of values.
+
+    """
+
+    m = len(values)
+    h = m // 2
+    lower = -np.inf
+    upper = np.inf
+    for i in range(m):
+        # values[i] takes sorted positions below to below+equal-1
+        below = 0
+        equal = 0
+        for j in range(m):
+            if values[j] < values[i]:
+                below += 1
+            elif values[j] == values[i]:
+                equal += 1
+        if below <= h < below + equal:
+            upper = values[i]
+        if below <= h - 1 < below + equal:
+            lower = values[i]
+
+    if m % 2 == 1:
+        return upper
+    return (lower + upper) / 2
+
+
+@helpers.njit('int64(int64[::1], float64[::1], int64[::1], float64[::1], int64[::1], float64[::1], float64[::1], float64[::1], int64, int64, int64, int64)', cache=True, fastmath=True)
+def robust_sampling(temperature_ux, temperature_y, level_ux, level_y, robust_ux, minval_y, maxval_y, mad_y,
+                    n, n_robust, s_delay, s_robust_width):
+    """
+    Find maxval, minval and MAD for historic data window.
+
+    Parameters
+    ----------
+    temperature_ux, temperature_y, level_ux, level_y : ndarray
+        Sensor sample buffers, filled up to n, sorted in time.
+    robust_ux, minval_y, maxval_y, mad_y : ndarray
+        Sensor robust statistic buffers, filled up to n_robust.
+    n : int
+        Number of samples, including the newest.
+    n_robust : int
+        Number of robust samples.
+    s_delay, s_robust_width : int
+        Algorithm parameters, see config.parameters.
+
+    Returns
+    -------
+    n_robust : int
+        Updated number of robust samples.
+
+    """
+
+    ux_now = temperature_ux[n-1]
+
+    # isolate robust window
+    # both time buffers are sorted, so window edges are found by binary search
+    t1 = max(ux_now - s_delay - s_robust_width, max(temperature_ux[0], level_ux[0]))
+    t2 = ux_now - s_delay
+    i1 = np.searchsorted(temperature_ux[:n], t1, side='left')
+    i2 = np.searchsorted(temperature_ux[:n], t2, side='right')
+    robust_window = temperature_y[i1:i2]
+
+    if len(robust_window) > 0:
+        k = np.searchsorted(level_ux[:n], t2, side='right')
+        robust_level = level_y[k-len(robust_window):k]
+
+        # calculate min and max of delayed window
+        yy = robust_window - robust_level
+        robust_ux[n_robust] = ux_now - s_delay
+        maxval_y[n_robust]  = yy.max()
+        minval_y[n_robust]  = yy.min()
+
+        # calculate mad
+        mad_y[n_robust] = select_median(np.abs(yy - select_median(yy)))
+        n_robust += 1
+
+    return n_robust
+
+
+@helpers.njit('UniTuple(int64, 3)({}, int64, int64, int64, int64, {})'.format(BUFFER_TYPES, PARAMETER_TYPES), cache=True, fastmath=True)
+def iterate_kernel(temperature_ux, temperature_y, level_ux, level_y, level_window, robust_ux, minval_y, maxval_y, mad_y,
+                   upper_offset_y, lower_offset_y,
+                   bound_ux, upper_bound_y, lower_bound_y, state, n, n_robust, robust_cycle, level_start,
+                   s_delay, s_robust_cycle, s_robust_width, n_robust_in_bounds, mmad, bound_minval, storage_maxtemp):
+    """
+    Iterate algorithm for the newest sample, writing results into the sensor buffers.
+
+    Parameters
+    ----------
+    temperature_ux, temperature_y : ndarray
+        Sensor temperature buffers, filled up to and including the newest sample n-1, sorted in time.
+    level_ux, level_y, bound_ux, upper_bound_y, lower_bound_y, state : ndarray
+        Sensor per-sample output buffers, filled up to n-1.
+    level_window : ndarray
+        Sorted temperature values of samples level_start to n-2.
+    robust_ux, minval_y, maxval_y, mad_y : ndarray
+        Sensor robust statistic buffers, filled up to n_robust.
+    upper_offset_y, lower_offset_y : ndarray
+        Upper and lower bound offset from level as of each robust sample, filled up to n_robust.
+    n : int
+        Number of samples, including the newest.
+    n_robust : int
+        Number of robust samples.
+    robust_cycle : int
+        Unixtime of last robust cycle trigger.
+    level_start : int
+        Index of first sample in level window.
+    s_delay, s_robust_cycle, s_robust_width, n_robust_in_bounds, mmad, bound_minval, storage_maxtemp : int or float
+        Algorithm parameters, see config.parameters.
+
+    Returns
+    -------
+    n_robust : int
+        Updated number of robust samples.
+    robust_cycle : int
+        Updated unixtime of last robust cycle trigger.
+    level_start : int
+        Updated index of first sample in level window.
+
+    """
+
+    # index of newest sample
+    i = n - 1
+    ux_now = temperature_ux[i]
+
+    # slide delay window forward, keeping its values sorted instead of sorting them every sample
+    # samples are sorted in time, so the window start is found by binary search
+    start = np.searchsorted(temperature_ux[:n], ux_now - 2*s_delay, side='right')
+    count = i - level_start
+    for j in range(level_start, start):
+        count = sorted_remove(level_window, count, temperature_y[j])
+    count = sorted_insert(level_window, count, temperature_y[i])
+    level_start = start
+
+    # calculate level as median of delay window, which always holds the newest sample
+    level_ux[i] = ux_now - s_delay
+    level_y[i]  = sorted_median(level_window, count)
+
+    # robust sampling back in time
+    if ux_now - robust_cycle > s_robust_cycle:
+        n_previous = n_robust
+        n_robust = robust_sampling(temperature_ux, temperature_y, level_ux, level_y, robust_ux, minval_y, maxval_y, mad_y,
+                                   n, n_robust, s_delay, s_robust_width)
+        robust_cycle = ux_now
+
+        # bounds relative to level only change with robust samples, so calculate them here once
+        if n_robust > n_previous:
+            n_bounds = min(n_robust, n_robust_in_bounds)
+            mad = small_median(mad_y[n_robust-n_bounds:n_robust])
+            upper_offset_y[n_robust-1] = max(bound_minval, small_median(maxval_y[n_robust-n_bounds:n_robust]) + mad*mmad)
+            lower_offset_y[n_robust-1] = min(-bound_minval, small_median(minval_y[n_robust-n_bounds:n_robust]) - mad*mmad)
+
+    # calculate bounds
+    if n_robust > 0:
+        # add level to bound
+        upper_value = level_y[i] + upper_offset_y[n_robust-1]
+        lower_value = level_y[i] + lower_offset_y[n_robust-1]
+    else:
+        # just pad with temperature values
+        upper_value = temperature_y[i]
+        lower_value = temperature_y[i]
+
+    # append calculated bounds
+    bound_ux[i]      = ux_now - s_delay
+    upper_bound_y[i] = upper_value
+    lower_bound_y[i] = lower_value
+
+    # set alert state based on level value
+    if level_y[i] > storage_maxtemp:
+        state[i] = 1
+    else:
+        state[i] = 0
+
+    return n_robust, robust_cycle, level_start
+
+
+@helpers.njit('UniTuple(int64, 3)({}, int64, int64, int64, int64, int64, {})'.format(BUFFER_TYPES, PARAMETER_TYPES), cache=True, fastmath=True)
+def batch_kernel(temperature_ux, temperature_y, level_ux, level_y, level_window, robust_ux, minval_y, maxval_y, mad_y,
+                 upper_offset_y, lower_offset_y,
+                 bound_ux, upper_bound_y, lower_bound_y, state, n_start, n_end, n_robust, robust_cycle, level_start,
+                 s_delay, s_robust_cycle, s_robust_width, n_robust_in_bounds, mmad, bound_minval, storage_maxtemp):
+    """
+    Run iterate_kernel for samples n_start to n_end of one sensor.
+
+    Parameters
+    ----------
+    temperature_ux, temperature_y, level_ux, level_y, level_window, robust_ux, minval_y, maxval_y, mad_y : ndarray
+        Sensor buffers, see iterate_kernel.
+    upper_offset_y, lower_offset_y : ndarray
+        Sensor buffers, see iterate_kernel.
+    bound_ux, upper_bound_y, lower_bound_y, state : ndarray
+        Sensor buffers, see iterate_kernel.
+    n_start : int
+        Number of samples already iterated.
+    n_end : int
+        Number of samples in temperature buffers.
+    n_robust, robust_cycle, level_start : int
+        Algorithm state after sample n_start-1, see iterate_kernel.
+    s_delay, s_robust_cycle, s_robust_width, n_robust_in_bounds, mmad, bound_minval, storage_maxtemp : int or float
+        Algorithm parameters, see config.parameters.
+
+    Returns
+    -------
+    n_robust, robust_cycle, level_start : int
+        Algorithm state after sample n_end-1.
+
+    """
+
+    for n in range(n_start+1, n_end+1):
+        n_robust, robust_cycle, level_start = iterate_kernel(
+            temperature_ux, temperature_y, level_ux, level_y, level_window, robust_ux, minval_y, maxval_y, mad_y,
+            upper_offset_y, lower_offset_y, bound_ux, upper_bound_y, lower_bound_y, state, n, n_robust, robust_cycle, level_start,
+            s_delay, s_robust_cycle, s_robust_width, n_robust_in_bounds, mmad, bound_minval, storage_maxtemp,
+        )
+
+    return n_robust, robust_cycle, level_start
+
+
+@helpers.njit('void(int64[::1], {}, int64[::1], int64[::1], int64[::1], {})'.format(BUFFER_TYPES, PARAMETER_TYPES),
+              cache=True, fastmath=True, parallel=True)
+def replay_kernel(offsets, temperature_ux, temperature_y, level_ux, level_y, level_window, robust_ux, minval_y, maxval_y, mad_y,
+                  upper_offset_y, lower_offset_y,
+                  bound_ux, upper_bound_y, lower_bound_y, state, n_robust, robust_cycle, level_start,
+                  s_delay, s_robust_cycle, s_robust_width, n_robust_in_bounds, mmad, bound_minval, storage_maxtemp):
+    """
+    Run batch_kernel over every sample of several sensors, one sensor per thread.
+
+    Parameters
+    ----------
+    offsets : ndarray
+        Sensor i occupies buffer indices offsets[i] to offsets[i+1].
+    temperature_ux, temperature_y : ndarray
+        Flat temperature buffers of all sensors, sorted in time per sensor.
+    level_ux, level_y, level_window, robust_ux, minval_y, maxval_y, mad_y, upper_offset_y, lower_offset_y : ndarray
+        Flat output buffers of the same length.
+    bound_ux, upper_bound_y, lower_bound_y, state : ndarray
+        Flat output buffers of the same length.
+    n_robust, robust_cycle, level_start : ndarray
+        Per sensor output of number of robust samples, last robust cycle trigger and level window start.
+    s_delay, s_robust_cycle, s_robust_width, n_robust_in_bounds, mmad, bound_minval, storage_maxtemp : int or float
+        Algorithm parameters, see config.parameters.
+
+    """
 
-        # isolate robust window
-        t1 = max([self.temperature_ux[-1] - params.S_DELAY - params.S_ROBUST_WIDTH, self.temperature_ux[0], self.level_ux[0]])
-        t2 = self.temperature_ux[-1] - params.S_DELAY
-        robust_window = np.array(self.temperature_y)[(self.temperature_ux >= t1) & (self.temperature_ux <= t2)]
-        robust_level  = np.array(self.level_y)[self.level_ux <= t2][-len(robust_window):]
-        
-        if len(robust_window) > 0:
-            # calculate min and max of delayed window
-            self.minval_ux.append(self.temperature_ux[-1] - params.S_DELAY)
-            self.maxval_ux.append(self.temperature_ux[-1] - params.S_DELAY)
-            self.maxval_y.append(max(robust_window - robust_level))
-            self.minval_y.append(min(robust_window - robust_level))
-        
-            # calculate mad
-            self.mad_ux.append(self.temperature_ux[-1] - params.S_DELAY)
-            yy = robust_window - robust_level
-            self.mad_y.append(np.median(abs(yy - np.median(yy))))
-        
-        # update cycle tracker
-        self.robust_cycle = self.temperature_ux[-1]
+    for s in helpers.prange(len(offsets)-1):
+        a = offsets[s]
+        b = offsets[s+1]
+        nr, rc, ls = batch_kernel(temperature_ux[a:b], temperature_y[a:b], level_ux[a:b], level_y[a:b], level_window[a:b],
+                                  robust_ux[a:b], minval_y[a:b], maxval_y[a:b], mad_y[a:b], upper_offset_y[a:b], lower_offset_y[a:b],
+                                  bound_ux[a:b], upper_bound_y[a:b], lower_bound_y[a:b], state[a:b],
+                                  0, b-a, 0, 0, 0,
+                                  s_delay, s_robust_cycle, s_robust_width, n_robust_in_bounds, mmad, bound_minval, storage_maxtemp)
+        n_robust[s]     = nr
+        robust_cycle[s] = rc
+        level_start[s]  = ls
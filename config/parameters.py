@@ -14,3 +14,14 @@ MMAD = 1                                                                    # ma
 BOUND_MINVAL = 0                                                            # minimum value allowed in bounds
 STORAGE_MAXTEMP = 4                                                         # critical temperature
 
+# buffers
+N_BUFFER_INIT = 2**12   # initial number of samples preallocated in sensor buffers, doubled when full
+
+# api
+N_HISTORY_THREADS = 16      # maximum number of devices fetching event history concurrently
+S_RECONNECT_MAX   = 30      # maximum seconds to wait between stream reconnection attempts
+N_STREAM_BATCH    = 32      # maximum number of queued stream events served together
+N_STREAM_QUEUE    = 2**10   # maximum number of received stream events waiting while serving stream
+
+# plotting
+S_PLOT_INTERVAL = 1     # minimum seconds between stream progress plot frames
@@ -10,10 +10,28 @@ PROJECT_ID = "PROJECT_ID"                # this is the project id
 API_URL_BASE = "https://api.disruptive-technologies.com/v2"
 
 
-if __name__ == '__main__':
+def main(username=USERNAME, password=PASSWORD, project_id=PROJECT_ID, api_url_base=API_URL_BASE):
+    """
+    Run anomaly detection on event history, then on the realtime stream.
+
+    Parameters
+    ----------
+    username : str
+        Service Account key.
+    password : str
+        Service Account secret.
+    project_id : str
+        Identifier of project to monitor.
+    api_url_base : str
+        REST API url base.
+
+    """
 
     # initialise Director instance
-    d = Director(USERNAME, PASSWORD, PROJECT_ID, API_URL_BASE)
+    d = Director(username, password, project_id, api_url_base)
+
+    # connect stream first, so that events arriving while history is fetched are kept
+    d.open_stream(n_reconnects=5)
 
     # iterate historic events
     d.run_history()
@@ -21,3 +39,6 @@ if __name__ == '__main__':
     # stream realtime events
     d.run_stream(n_reconnects=5)
 
+
+if __name__ == '__main__':
+    main()